@@ -1,61 +1,76 @@
 #!/usr/bin/env python
 import argparse
+import collections
 import cv2
-import imutils
-import zmq  # Import ZeroMQ
-import time
+import hashlib
+import io
 import sys
-import logging
-import os
-import numpy as np
 import socket  # Added for client-server communication
+import select
+import struct
+import time
 from datetime import datetime
-from multiprocessing import Value, Process
-from threading import Thread
+from threading import Thread, Event, current_thread
 from configparser import ConfigParser
 from pathlib import Path
-from imutils.video import FPS
 from utils.video import VideoStream
-from utils.button_inputs import BasicController
+from utils.button_inputs import BasicController, ControllerState
 from utils.image_sampler import ImageRecorder
-from utils.blur_algorithms import fft_blur
-from utils.greenonbrown import GreenOnBrown
-from utils.greenongreen import GreenOnGreen
 from utils.relay_control import RelayController, StatusIndicator
 from utils.frame_reader import FrameReader
-from utils.error_handler import ErrorHandler
 from utils.custom_logger import setup_logger
 
 # Define server host and port
 SERVER_HOST = '127.0.0.1'  # Replace with server's IP address if needed
 SERVER_PORT = 5000
 
+# Same-host connections use a Unix domain socket and skip the loopback TCP stack
+SERVER_SOCKET_PATH = '/tmp/owl-can-cmd.sock'
+USE_UNIX_SOCKET = SERVER_HOST in ('127.0.0.1', 'localhost') and hasattr(socket, 'AF_UNIX')
+
+# Every message on the socket is prefixed with its payload length as a 4-byte big-endian integer
+FRAME_HEADER = struct.Struct('>I')
+
+# Commands arrive as a 2-byte big-endian CAN id
+COMMAND_ID = struct.Struct('>H')
+
+# CAN ids are consecutive, so the tables are indexed by (id - base) instead of hashed
+_CAN_BASE = 0x301
+_CAN_TABLE = ("pause", "play", "boom_flush", "stop", "save_config")
+_ERROR_BASE = 0x401
+_ERROR_TABLE = ("Camera Error", "Relay Error", "Processing Error", "Configuration Error")
+
 # Define CAN bus command codes and their corresponding actions
-CAN_COMMANDS = {
-    "pause": "pause",
-    "play": "play",
-    "boom_flush": "boom_flush",
-    "stop": "stop",
-    "save_config": "save_config"
-}
+CAN_COMMANDS = {name: _CAN_BASE + index for index, name in enumerate(_CAN_TABLE)}
 
 # Define custom error types and codes
-ERROR_CODES = {
-    0x401: "Camera Error",
-    0x402: "Relay Error",
-    0x403: "Processing Error",
-    0x404: "Configuration Error"
-}
+ERROR_CODES = {_ERROR_BASE + index: name for index, name in enumerate(_ERROR_TABLE)}
+
+# Encoded "<code> <name>: " prefix for each error, built once rather than formatted per report
+ERROR_PREFIXES = tuple(f"{code:x} {name}: ".encode() for code, name in ERROR_CODES.items())
+
+
+def to_boolean(value):
+    """ Convert a raw config string to a bool using the same rules as ConfigParser.getboolean. """
+    if value.lower() not in ConfigParser.BOOLEAN_STATES:
+        raise ValueError(f"Not a boolean: {value}")
+    return ConfigParser.BOOLEAN_STATES[value.lower()]
 
 class OwlClient:
     def __init__(self, show_display=False, focus=False, input_file_or_directory=None, config_file='config/DAY_SENSITIVITY_2.ini'):
         # Initialize logging
         setup_logger()
 
+        # Command listener thread and the event used to shut it down
+        self.command_thread = None
+        self._stop_event = Event()
+
         # Initialize configuration
         self._config_path = Path(__file__).parent / config_file
         self.config = ConfigParser()
         self.config.read(self._config_path)
+        self._resolve_config()
+        self._last_config_hash = self._config_digest()[1]
 
         # Initialize display and detection settings
         self.show_display = show_display
@@ -64,11 +79,12 @@ class OwlClient:
         self.disable_detection = False
         
         # Initialize controller settings
-        self.enable_controller = self.config.getboolean('Controller', 'enable_controller')
-        self.switch_purpose = self.config.get('Controller', 'switch_purpose')
-        self.switch_pin = self.config.getint('Controller', 'switch_pin')
+        controller = self._section('Controller')
+        self.enable_controller = to_boolean(controller['enable_controller'])
+        self.switch_purpose = controller['switch_purpose']
+        self.switch_pin = int(controller['switch_pin'])
 
-        # Setup controller and multiprocessing
+        # Setup controller thread
         if self.enable_controller:
             self._setup_controller()
 
@@ -76,67 +92,175 @@ class OwlClient:
         self._setup_camera()
         self._setup_relays()
 
+        # Map CAN commands to their handlers once, rather than comparing strings per message
+        self._dispatch = {
+            "pause": self._pause,
+            "play": self._play,
+            "boom_flush": self._boom_flush,
+            "stop": self._stop,
+            "save_config": self._save_config
+        }
+        # the listener indexes handlers by (CAN id - _CAN_BASE)
+        self._dispatch_by_id = tuple(self._dispatch[name] for name in _CAN_TABLE)
+
+        # the listener only queues handlers; hoot() runs them between frames on the main thread
+        self._pending_commands = collections.deque()
+
+        # reusable receive buffer for the command listener
+        self._cmd_buf = bytearray(4096)
+        self._cmd_view = memoryview(self._cmd_buf)
+
         # Initialize image sampling configuration
         self._setup_image_sampling()
 
         # Initialize client socket for server communication
-        self.client_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        if USE_UNIX_SOCKET:
+            self.client_socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        else:
+            self.client_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            self._configure_tcp_socket()
         self.connect_to_server()
 
+    def _configure_tcp_socket(self):
+        """ Tune the TCP socket for small, latency sensitive command and status messages. """
+        # flush small messages immediately rather than waiting on Nagle's algorithm
+        self.client_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.client_socket.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 1 << 20)
+        self.client_socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1 << 20)
+
+        # detect a dead server within seconds instead of the multi-minute system default
+        self.client_socket.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+        if hasattr(socket, 'TCP_KEEPIDLE'):
+            self.client_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, 5)
+            self.client_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPINTVL, 2)
+            self.client_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPCNT, 3)
+
+    def _resolve_config(self):
+        """ Resolve config values used by the main loop into typed attributes. """
+        # snapshot every section as a plain dict so setup reads are dict lookups, not ConfigParser traversals
+        self._sections = {name: dict(self.config[name]) for name in self.config.sections()}
+
+        self._algorithm = self._section('System')['algorithm']
+        self._log_fps = to_boolean(self._section('DataCollection')['log_fps'])
+        self._image_loop_time = int(self._section('Visualisation')['image_loop_time'])
+
+    def _section(self, name):
+        """ Return the cached raw string values of a config section. """
+        return self._sections[name]
+
     def connect_to_server(self):
         """ Connect to the PyQt5 server. """
         try:
-            self.client_socket.connect((SERVER_HOST, SERVER_PORT))
-            print(f"Connected to server at {SERVER_HOST}:{SERVER_PORT}")
+            if USE_UNIX_SOCKET:
+                self.client_socket.connect(SERVER_SOCKET_PATH)
+                print(f"Connected to server at {SERVER_SOCKET_PATH}")
+            else:
+                self.client_socket.connect((SERVER_HOST, SERVER_PORT))
+                print(f"Connected to server at {SERVER_HOST}:{SERVER_PORT}")
             # Start a thread to listen for commands from the server
-            Thread(target=self.listen_for_commands, daemon=True).start()
+            self.command_thread = Thread(target=self.listen_for_commands, daemon=True)
+            self.command_thread.start()
         except Exception as e:
             print(f"Failed to connect to server: {e}")
             sys.exit(1)
 
     def listen_for_commands(self):
-        """ Listen for commands from the server and execute them. """
-        while True:
+        """ Listen for length-prefixed commands from the server and queue them for the frame loop. """
+        buf = self._cmd_buf
+        view = self._cmd_view
+        header_size = FRAME_HEADER.size
+        handlers = self._dispatch_by_id
+        # Linux re-enables delayed ACKs after each read, so quick ACK mode has to be re-armed every time
+        quick_ack = not USE_UNIX_SOCKET and hasattr(socket, 'TCP_QUICKACK')
+        pending = self._pending_commands
+        filled = 0
+        while not self._stop_event.is_set():
             try:
-                command = self.client_socket.recv(1024).decode()
-                if command:
-                    print(f"Received command: {command}")
-                    self.execute_can_command(command)
+                # wait with a timeout so a stop request is noticed even when the server is quiet
+                readable, _, _ = select.select([self.client_socket], [], [], 1.0)
+                if not readable:
+                    continue
+
+                received = self.client_socket.recv_into(view[filled:])
+                if not received:
+                    # an empty read means the server closed the connection; stop rather than spin
+                    if not self._stop_event.is_set():
+                        print("[INFO] Server closed the connection.")
+                    break
+                filled += received
+                if quick_ack:
+                    self.client_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_QUICKACK, 1)
+                # drain everything already queued on the socket so bursts are handled in one pass
+                while filled < len(buf):
+                    try:
+                        received = self.client_socket.recv_into(view[filled:], 0, socket.MSG_DONTWAIT)
+                    except BlockingIOError:
+                        break
+                    if not received:
+                        break
+                    filled += received
+
+                # dispatch every complete frame, keeping a trailing partial frame for the next read
+                start = 0
+                while filled - start >= header_size:
+                    (length,) = FRAME_HEADER.unpack_from(buf, start)
+                    if length > len(buf) - header_size:
+                        raise ValueError(f"command of {length} bytes exceeds the receive buffer")
+                    end = start + header_size + length
+                    if end > filled:
+                        break
+                    if length == COMMAND_ID.size:
+                        index = COMMAND_ID.unpack_from(buf, start + header_size)[0] - _CAN_BASE
+                        if 0 <= index < len(handlers):
+                            pending.append(handlers[index])
+                    start = end
+
+                if start:
+                    buf[:filled - start] = buf[start:filled]
+                    filled -= start
             except Exception as e:
-                print(f"Error receiving command: {e}")
+                if not self._stop_event.is_set():
+                    print(f"Error receiving command: {e}")
                 break
 
     def send_status_to_server(self, status_message):
         """ Send status messages back to the server. """
-        try:
-            self.client_socket.send(status_message.encode())
+        if self._send_frame(status_message.encode()):
             print(f"[STATUS] Sent to server: {status_message}")
+
+    def _send_frame(self, payload):
+        """ Send an encoded payload to the server with its length prefix. Returns True on success. """
+        try:
+            self.client_socket.sendall(FRAME_HEADER.pack(len(payload)) + payload)
+            return True
         except Exception as e:
             print(f"Error sending status to server: {e}")
+            return False
 
     def _setup_controller(self):
-        """ Setup button controller and related multiprocessing """
-        self.detection_state = Value('b', False)
-        self.sample_state = Value('b', False)
-        self.stop_flag = Value('b', False)
-        self.basic_controller = BasicController(detection_state=self.detection_state,
-                                                sample_state=self.sample_state,
+        """ Setup button controller and its thread """
+        # the controller thread flips plain bool flags that the main loop reads every frame
+        self.controller_state = ControllerState()
+        self.stop_flag = Event()
+        self.basic_controller = BasicController(controller_state=self.controller_state,
                                                 stop_flag=self.stop_flag,
                                                 switch_board_pin=f'BOARD{self.switch_pin}',
                                                 switch_purpose=self.switch_purpose)
-        self.basic_controller_process = Process(target=self.basic_controller.run)
-        self.basic_controller_process.start()
+        # switch polling is GPIO I/O, so a thread is enough and avoids forking a second interpreter
+        self.basic_controller_thread = Thread(target=self.basic_controller.run, daemon=True)
+        self.basic_controller_thread.start()
 
     def _setup_camera(self):
         """ Setup camera or frame reader based on input source """
-        self.resolution = (self.config.getint('Camera', 'resolution_width'),
-                           self.config.getint('Camera', 'resolution_height'))
-        self.exp_compensation = self.config.getint('Camera', 'exp_compensation')
+        camera = self._section('Camera')
+        self.resolution = (int(camera['resolution_width']),
+                           int(camera['resolution_height']))
+        self.exp_compensation = int(camera['exp_compensation'])
 
         # Setup input source (camera or file/directory)
         try:
             if self.input_file_or_directory:
-                self.cam = FrameReader(path=self.input_file_or_directory, resolution=self.resolution, loop_time=self.config.getint('Visualisation', 'image_loop_time'))
+                self.cam = FrameReader(path=self.input_file_or_directory, resolution=self.resolution, loop_time=self._image_loop_time)
             else:
                 self.cam = VideoStream(resolution=self.resolution, exp_compensation=self.exp_compensation).start()
             
@@ -150,7 +274,7 @@ class OwlClient:
     def _setup_relays(self):
         """ Setup relay configurations from the config file """
         try:
-            self.relay_dict = {int(key): int(value) for key, value in self.config['Relays'].items()}
+            self.relay_dict = {int(key): int(value) for key, value in self._section('Relays').items()}
             self.relay_controller = RelayController(relay_dict=self.relay_dict)
             self.logger = self.relay_controller.logger
         except Exception as e:
@@ -159,15 +283,16 @@ class OwlClient:
 
     def _setup_image_sampling(self):
         """ Setup image sampling settings if enabled """
-        self.sample_images = self.config.getboolean('DataCollection', 'sample_images')
+        data_collection = self._section('DataCollection')
+        self.sample_images = to_boolean(data_collection['sample_images'])
         if self.sample_images:
             try:
-                self.sample_method = self.config.get('DataCollection', 'sample_method')
-                self.disable_detection = self.config.getboolean('DataCollection', 'disable_detection')
-                self.sample_frequency = self.config.getint('DataCollection', 'sample_frequency')
-                self.enable_device_save = self.config.getboolean('DataCollection', 'enable_device_save')
-                self.save_directory = self.config.get('DataCollection', 'save_directory')
-                self.camera_name = self.config.get('DataCollection', 'camera_name')
+                self.sample_method = data_collection['sample_method']
+                self.disable_detection = to_boolean(data_collection['disable_detection'])
+                self.sample_frequency = int(data_collection['sample_frequency'])
+                self.enable_device_save = to_boolean(data_collection['enable_device_save'])
+                self.save_directory = data_collection['save_directory']
+                self.camera_name = data_collection['camera_name']
 
                 self.indicators = StatusIndicator(save_directory=self.save_directory)
                 self.save_subdirectory = self.indicators.setup_directories(enable_device_save=self.enable_device_save)
@@ -179,48 +304,73 @@ class OwlClient:
 
     def report_error(self, error_code, error_message):
         """ Send a custom error message to the server """
-        full_message = f"{error_code:x} {ERROR_CODES[error_code]}: {error_message}"
-        self.send_status_to_server(full_message)
-        print(f"[ERROR REPORT] Sent to server: {full_message}")
+        index = error_code - _ERROR_BASE
+        if 0 <= index < len(ERROR_PREFIXES):
+            prefix = ERROR_PREFIXES[index]
+        else:
+            # unknown codes are still reported, under a generic prefix, rather than failing inside the reporter
+            prefix = f"{error_code:x} Unknown Error: ".encode()
+        payload = prefix + error_message.encode('utf-8', 'replace')
+        if self._send_frame(payload):
+            print(f"[ERROR REPORT] Sent to server: {payload.decode('utf-8', 'replace')}")
 
     def execute_can_command(self, command):
         """ Execute actions based on received CAN command. """
-        if command == "pause":
-            print("[ACTION] Pausing script...")
-            # Implement pausing logic here
-        elif command == "play":
-            print("[ACTION] Playing script...")
-            # Implement playing logic here
-        elif command == "boom_flush":
-            print("[ACTION] Boom Flush - Turning all relays ON!")
-            self.relay_controller.relay.all_on()
-        elif command == "stop":
-            print("[ACTION] Stopping script...")
-            self.stop()
-        elif command == "save_config":
-            print("[ACTION] Saving current configuration...")
-            self.save_parameters()
+        handler = self._dispatch.get(command)
+        if handler is not None:
+            handler()
+
+    def _pause(self):
+        print("[ACTION] Pausing script...")
+        # Implement pausing logic here
+
+    def _play(self):
+        print("[ACTION] Playing script...")
+        # Implement playing logic here
+
+    def _boom_flush(self):
+        print("[ACTION] Boom Flush - Turning all relays ON!")
+        self.relay_controller.relay.all_on()
+
+    def _stop(self):
+        print("[ACTION] Stopping script...")
+        self.stop()
+
+    def _save_config(self):
+        print("[ACTION] Saving current configuration...")
+        self.save_parameters()
 
     def hoot(self):
         """ Main processing loop for the Owl system. """
-        algorithm = self.config.get('System', 'algorithm')
-        log_fps = self.config.getboolean('DataCollection', 'log_fps')
+        algorithm = self._algorithm
+        log_fps = self._log_fps
         frame_count = 0
 
-        if log_fps:
-            fps = FPS().start()
+        # a perf_counter read at the end replaces a timestamp per frame
+        fps_t0 = time.perf_counter()
+
+        if self.enable_controller:
+            ctrl_state = self.controller_state
+
+        # bind the per-frame calls once so the loop skips the repeated attribute lookups
+        cam_read = self.cam.read
+        pending = self._pending_commands
 
         try:
             while True:
+                # run CAN commands here so they act on the live relay/camera objects from one thread
+                while pending:
+                    pending.popleft()()
+
                 if self.enable_controller:
-                    self.disable_detection = not self.detection_state.value
-                    self.sample_images = self.sample_state.value
+                    self.disable_detection = not ctrl_state.detection
+                    self.sample_images = ctrl_state.sampling
 
-                frame = self.cam.read()
+                frame = cam_read()
                 if frame is None:
                     if log_fps:
-                        fps.stop()
-                        print(f"[INFO] Stopped. Approximate FPS: {fps.fps():.2f}")
+                        elapsed = time.perf_counter() - fps_t0
+                        print(f"[INFO] Stopped. Approximate FPS: {frame_count / elapsed if elapsed > 0 else 0.0:.2f}")
                     self.stop()
                     break
 
@@ -228,18 +378,18 @@ class OwlClient:
                 # ... [detection logic remains unchanged]
 
                 frame_count += 1
-                if log_fps:
-                    fps.update()
 
                 # Handle display
                 # ... [existing display code remains unchanged]
 
-                k = cv2.waitKey(1) & 0xFF
-                if k == ord('s'):
-                    self.save_parameters()
-                elif k == 27:  # Escape key
-                    self.stop()
-                    break
+                # waitKey pumps the GUI event loop for at least 1 ms, so only call it when there is a window
+                if self.show_display:
+                    k = cv2.waitKey(1) & 0xFF
+                    if k == ord('s'):
+                        self.save_parameters()
+                    elif k == 27:  # Escape key
+                        self.stop()
+                        break
 
         except KeyboardInterrupt:
             self.stop()
@@ -255,14 +405,21 @@ class OwlClient:
 
         if self.enable_controller:
             self.basic_controller.stop()
-            self.basic_controller_process.join()
+            self.basic_controller_thread.join()
 
         if self.sample_images:
             self.indicators.stop()
             self.image_recorder.stop()
 
-        # Disconnect from server
+        # Disconnect from server, shutting the socket down first so a blocked recv() returns
+        self._stop_event.set()
+        try:
+            self.client_socket.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
         self.client_socket.close()
+        if self.command_thread is not None and self.command_thread is not current_thread():
+            self.command_thread.join(timeout=1)
         print("[INFO] Disconnected from server.")
 
         if self.show_display:
@@ -270,8 +427,15 @@ class OwlClient:
 
         sys.exit()
 
+    def _config_digest(self):
+        """ Serialise the configuration and return it with a short blake2b digest of the text. """
+        buffer = io.StringIO()
+        self.config.write(buffer)
+        config_text = buffer.getvalue()
+        return config_text, hashlib.blake2b(config_text.encode(), digest_size=16).digest()
+
     def save_parameters(self):
-        """ Save current configuration parameters to a new file. """
+        """ Save current configuration parameters to a new file, skipping the write if nothing changed. """
         try:
             timestamp = datetime.now().strftime('%Y%m%d-%H%M%S')
             new_config_filename = f"{timestamp}_{self._config_path.name}"
@@ -280,6 +444,16 @@ class OwlClient:
             # Update configuration parameters
             # ... [existing parameter saving code remains unchanged]
 
+            config_text, config_hash = self._config_digest()
+            if config_hash == self._last_config_hash:
+                print("[INFO] Configuration unchanged, skipping save.")
+                return
+
+            with open(new_config_path, 'w') as configfile:
+                configfile.write(config_text)
+
+            self._last_config_hash = config_hash
+            self._resolve_config()
             print(f"[INFO] Configuration saved to {new_config_path}")
         except Exception as e:
             self.report_error(0x404, f"Failed to save configuration: {e}")
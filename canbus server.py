@@ -1,5 +1,7 @@
+import os
 import sys
 import socket
+import struct
 import threading
 from PyQt5.QtWidgets import QApplication, QMainWindow, QPushButton, QLabel, QVBoxLayout, QWidget, QMessageBox, QHBoxLayout, QListWidget
 from PyQt5.QtCore import pyqtSignal, QObject
@@ -8,6 +10,16 @@ from PyQt5.QtCore import pyqtSignal, QObject
 SERVER_HOST = '127.0.0.1'
 SERVER_PORT = 5000
 
+# Same-host connections use a Unix domain socket and skip the loopback TCP stack
+SERVER_SOCKET_PATH = '/tmp/owl-can-cmd.sock'
+USE_UNIX_SOCKET = SERVER_HOST in ('127.0.0.1', 'localhost') and hasattr(socket, 'AF_UNIX')
+
+# Every message on the socket is prefixed with its payload length as a 4-byte big-endian integer
+FRAME_HEADER = struct.Struct('>I')
+
+# Commands are sent as a 2-byte big-endian CAN id
+COMMAND_ID = struct.Struct('>H')
+
 # Define CAN bus command codes and their corresponding actions
 CAN_COMMANDS = {
     "pause": 0x301,
@@ -43,18 +55,36 @@ class ClientHandlerThread(QObject):
         self.update_status_signal.emit(f"Client connected from {self.client_address}")
         try:
             while self.running:
-                message = self.client_socket.recv(1024).decode()
-                if message:
-                    self.update_status_signal.emit(f"Received from {self.client_address}: {message}")
+                header = self._recv_exact(FRAME_HEADER.size)
+                if header is None:
+                    break
+                (length,) = FRAME_HEADER.unpack(header)
+                message = self._recv_exact(length)
+                if message is None:
+                    break
+                self.update_status_signal.emit(f"Received from {self.client_address}: {message.decode()}")
         except Exception as e:
             self.update_error_signal.emit(f"Client connection error: {e}")
         finally:
             self.stop()
 
+    def _recv_exact(self, size):
+        """ Read exactly size bytes, returning None if the client disconnects first. """
+        data = bytearray(size)
+        view = memoryview(data)
+        received = 0
+        while received < size:
+            count = self.client_socket.recv_into(view[received:])
+            if not count:
+                return None
+            received += count
+        return bytes(data)
+
     def send_command(self, command):
-        """ Send a command to the client. """
+        """ Send a command to the client as a length-prefixed CAN id. """
         try:
-            self.client_socket.send(command.encode())
+            payload = COMMAND_ID.pack(CAN_COMMANDS[command])
+            self.client_socket.sendall(FRAME_HEADER.pack(len(payload)) + payload)
             self.update_status_signal.emit(f"Sent command to {self.client_address}: {command}")
         except Exception as e:
             self.update_error_signal.emit(f"Error sending data to {self.client_address}: {e}")
@@ -74,13 +104,22 @@ class ServerThread(QObject):
 
     def __init__(self):
         super().__init__()
-        self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        if USE_UNIX_SOCKET:
+            self.server_socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        else:
+            self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         self.clients = []
         self.server_running = False
 
     def start_server(self):
         try:
-            self.server_socket.bind((SERVER_HOST, SERVER_PORT))
+            if USE_UNIX_SOCKET:
+                # remove a socket file left behind by a previous run
+                if os.path.exists(SERVER_SOCKET_PATH):
+                    os.unlink(SERVER_SOCKET_PATH)
+                self.server_socket.bind(SERVER_SOCKET_PATH)
+            else:
+                self.server_socket.bind((SERVER_HOST, SERVER_PORT))
             self.server_socket.listen(5)  # Listen for up to 5 client connections
             self.server_running = True
             threading.Thread(target=self.accept_clients, daemon=True).start()
@@ -93,6 +132,9 @@ class ServerThread(QObject):
         while self.server_running:
             try:
                 client_socket, client_address = self.server_socket.accept()
+                if USE_UNIX_SOCKET:
+                    # Unix domain peers are unnamed, so label them by socket descriptor instead
+                    client_address = f"{SERVER_SOCKET_PATH} (fd {client_socket.fileno()})"
                 client_handler = ClientHandlerThread(client_socket, client_address, self)
                 self.clients.append(client_handler)
                 self.update_client_list_signal.emit()
@@ -121,6 +163,8 @@ class ServerThread(QObject):
         for client in self.clients:
             client.stop()
         self.server_socket.close()
+        if USE_UNIX_SOCKET and os.path.exists(SERVER_SOCKET_PATH):
+            os.unlink(SERVER_SOCKET_PATH)
         self.update_status_signal.emit("Server stopped.")
 
 class OwlControllerApp(QMainWindow):
@@ -1,33 +1,32 @@
 #!/usr/bin/env python
-from utils.button_inputs import BasicController
+from utils.button_inputs import BasicController, ControllerState
 from utils.image_sampler import ImageRecorder
 from utils.blur_algorithms import fft_blur
 from utils.greenonbrown import GreenOnBrown
 from utils.relay_control import RelayController, StatusIndicator
 from utils.frame_reader import FrameReader
+from utils.config import OwlConfig
 
-from multiprocessing import Value, Process
+from threading import Thread, Event
+from queue import Queue, Full, Empty
 from configparser import ConfigParser
 from pathlib import Path
 from datetime import datetime
-from imutils.video import FPS
 from utils.video import VideoStream
 from time import strftime
 
 import argparse
-import imutils
+import hashlib
+import numpy as np
 import time
 import sys
 import cv2
+import io
 import os
 
 
-def nothing(x):
-    pass
-
-
 class Owl:
-   def __init__(self, show_display=False, focus=False, input_file_or_directory=None, config_file='config/DAY_SENSITIVITY_2.ini'):
+    def __init__(self, show_display=False, focus=False, input_file_or_directory=None, config_file='config/DAY_SENSITIVITY_2.ini'):
         # Load configuration
         self._load_configuration(config_file)
 
@@ -35,6 +34,7 @@ class Owl:
         self.input_file_or_directory = input_file_or_directory
         self.show_display = show_display
         self.focus = focus
+        self.weed_detector = None
 
         # Setup controller
         self._setup_controller()
@@ -42,18 +42,20 @@ class Owl:
         # Setup camera settings and thresholds
         self._setup_camera()
 
-        # Initialize threshold adjustment UI if necessary
-        if self.show_display or self.focus:
-            self._setup_threshold_adjustment_ui()
-
         # Initialize relay controller
         self._setup_relay_controller()
 
         # Setup video input source (camera or file)
         self._setup_video_source()
 
+        # Start the display thread, which owns the output and threshold adjustment windows
+        if self.show_display:
+            self._setup_display()
+
         # Setup data collection if enabled
-        if self.config.getboolean('DataCollection', 'sample_images'):
+        self.sample_images = self.cfg.sample_images
+        self.disable_detection = False
+        if self.sample_images:
             self._setup_data_collection()
 
         # Additional setup for relay control and lane calculations
@@ -63,79 +65,143 @@ class Owl:
         self._config_path = Path(__file__).parent / config_file
         self.config = ConfigParser()
         self.config.read(self._config_path)
+        # typed values for setup and hoot(), cast from the parser already read; the ConfigParser itself is kept only
+        # for saving adjusted thresholds
+        self.cfg = OwlConfig.from_parser(self.config)
+        self._last_config_hash = self._config_digest()[1]
 
     def _setup_controller(self):
-        self.enable_controller = self.config.getboolean('Controller', 'enable_controller')
-        self.switch_purpose = self.config.get('Controller', 'switch_purpose')
-        self.switch_pin = self.config.getint('Controller', 'switch_pin')
+        self.enable_controller = self.cfg.enable_controller
+        self.switch_purpose = self.cfg.switch_purpose
+        self.switch_pin = self.cfg.switch_pin
 
         if self.enable_controller:
-            self.detection_state = Value('b', False)
-            self.sample_state = Value('b', False)
-            self.stop_flag = Value('b', False)
+            # the controller thread flips plain bool flags that the main loop reads every frame
+            self.controller_state = ControllerState()
+            self.stop_flag = Event()
             self.basic_controller = BasicController(
-                detection_state=self.detection_state,
-                sample_state=self.sample_state,
+                controller_state=self.controller_state,
                 stop_flag=self.stop_flag,
                 switch_board_pin=f'BOARD{self.switch_pin}',
                 switch_purpose=self.switch_purpose
             )
-            self.basic_controller_process = Process(target=self.basic_controller.run)
-            self.basic_controller_process.start()
+            # switch polling is GPIO I/O, so a thread is enough and avoids forking a second interpreter
+            self.basic_controller_thread = Thread(target=self.basic_controller.run, daemon=True)
+            self.basic_controller_thread.start()
 
     def _setup_camera(self):
-        self.resolution = (
-            self.config.getint('Camera', 'resolution_width'),
-            self.config.getint('Camera', 'resolution_height')
-        )
-        self.exp_compensation = self.config.getint('Camera', 'exp_compensation')
+        self.resolution = (self.cfg.resolution_width, self.cfg.resolution_height)
+        self.exp_compensation = self.cfg.exp_compensation
         # Threshold parameters for different algorithms
-        self.exgMin = self.config.getint('GreenOnBrown', 'exgMin')
-        self.exgMax = self.config.getint('GreenOnBrown', 'exgMax')
-        self.hueMin = self.config.getint('GreenOnBrown', 'hueMin')
-        self.hueMax = self.config.getint('GreenOnBrown', 'hueMax')
-        self.saturationMin = self.config.getint('GreenOnBrown', 'saturationMin')
-        self.saturationMax = self.config.getint('GreenOnBrown', 'saturationMax')
-        self.brightnessMin = self.config.getint('GreenOnBrown', 'brightnessMin')
-        self.brightnessMax = self.config.getint('GreenOnBrown', 'brightnessMax')
+        self.exgMin = self.cfg.exg_min
+        self.exgMax = self.cfg.exg_max
+        self.hueMin = self.cfg.hue_min
+        self.hueMax = self.cfg.hue_max
+        self.saturationMin = self.cfg.saturation_min
+        self.saturationMax = self.cfg.saturation_max
+        self.brightnessMin = self.cfg.brightness_min
+        self.brightnessMax = self.cfg.brightness_max
 
         # Ensure resolution isn't too high
         total_pixels = self.resolution[0] * self.resolution[1]
         if total_pixels > (832 * 640):
             self.resolution = (416, 320)
-            self.logger.log_line(f"[WARNING] Resolution {self.config.getint('Camera', 'resolution_width')}, "
-                                 f"{self.config.getint('Camera', 'resolution_height')} selected is dangerously high.",
-                                 verbose=True)
+            print(f"[WARNING] Resolution {self.cfg.resolution_width}, "
+                  f"{self.cfg.resolution_height} selected is dangerously high.")
+
+    def _setup_display(self):
+        # the input resolution is fixed for the run, so size the 600 px wide display frame once
+        display_height = int(600 * self.frame_height / self.frame_width)
+        self._disp_size = (600, display_height)
+        self._disp_interpolation = cv2.INTER_AREA if self.frame_width > 600 else cv2.INTER_LINEAR
+
+        # HighGUI windows must be driven from a single thread, so a UI thread owns them and blocks in
+        # imshow/waitKey instead of hoot(). hoot() hands over resized frames through a one-slot queue, dropping
+        # the oldest when the UI falls behind, and reads back key presses and slider positions.
+        self._ui_queue = Queue(maxsize=1)
+        self._key_queue = Queue()
+        # one buffer being shown, one queued and one being filled; buffers come back once imshow has copied them
+        self._free_displays = Queue()
+        for _ in range(3):
+            self._free_displays.put(np.empty((display_height, 600, 3), np.uint8))
+
+        self._trackbar_values = None
+        self._applied_trackbars = None
+        self._ui_running = Event()
+        self._ui_running.set()
+        self._ui_thread = Thread(target=self._run_display, daemon=True)
+        self._ui_thread.start()
+
+    def _run_display(self):
+        self._setup_threshold_adjustment_ui()
+
+        while self._ui_running.is_set():
+            try:
+                display, threshold = self._ui_queue.get(timeout=0.1)
+                cv2.imshow("Detection Output", display)
+                if threshold is not None:
+                    cv2.imshow("HSV Threshold on ExG", threshold)
+                self._free_displays.put(display)
+            except Empty:
+                pass
+
+            k = cv2.waitKey(1) & 0xFF
+            if k == ord('s') or k == 27:
+                self._key_queue.put(k)
+
+            if self._trackbars_dirty:
+                self._trackbars_dirty = False
+                # publish a new tuple rather than mutating one, so hoot() always sees a complete set of positions
+                self._trackbar_values = tuple(cv2.getTrackbarPos(name, self.window_name) for name in
+                                              ("ExG-Min", "ExG-Max", "Hue-Min", "Hue-Max", "Sat-Min", "Sat-Max",
+                                               "Bright-Min", "Bright-Max"))
+
+        cv2.destroyAllWindows()
+
+    def _apply_trackbars(self):
+        # take the slider positions published by the UI thread, if they changed since the last call
+        trackbars = self._trackbar_values
+        if trackbars is not self._applied_trackbars:
+            self._applied_trackbars = trackbars
+            (self.exgMin, self.exgMax, self.hueMin, self.hueMax, self.saturationMin,
+             self.saturationMax, self.brightnessMin, self.brightnessMax) = trackbars
+            self._refresh_detect()
 
     def _setup_threshold_adjustment_ui(self):
         self.window_name = "Adjust Detection Thresholds"
         cv2.namedWindow(self.window_name, cv2.WINDOW_AUTOSIZE)
-        cv2.createTrackbar("ExG-Min", self.window_name, self.exgMin, 255, nothing)
-        cv2.createTrackbar("ExG-Max", self.window_name, self.exgMax, 255, nothing)
-        cv2.createTrackbar("Hue-Min", self.window_name, self.hueMin, 179, nothing)
-        cv2.createTrackbar("Hue-Max", self.window_name, self.hueMax, 179, nothing)
-        cv2.createTrackbar("Sat-Min", self.window_name, self.saturationMin, 255, nothing)
-        cv2.createTrackbar("Sat-Max", self.window_name, self.saturationMax, 255, nothing)
-        cv2.createTrackbar("Bright-Min", self.window_name, self.brightnessMin, 255, nothing)
-        cv2.createTrackbar("Bright-Max", self.window_name, self.brightnessMax, 255, nothing)
+
+        # trackbar callbacks fire from waitKey, so the positions are only re-read after a slider has moved
+        self._trackbars_dirty = False
+        cv2.createTrackbar("ExG-Min", self.window_name, self.exgMin, 255, self._mark_trackbars_dirty)
+        cv2.createTrackbar("ExG-Max", self.window_name, self.exgMax, 255, self._mark_trackbars_dirty)
+        cv2.createTrackbar("Hue-Min", self.window_name, self.hueMin, 179, self._mark_trackbars_dirty)
+        cv2.createTrackbar("Hue-Max", self.window_name, self.hueMax, 179, self._mark_trackbars_dirty)
+        cv2.createTrackbar("Sat-Min", self.window_name, self.saturationMin, 255, self._mark_trackbars_dirty)
+        cv2.createTrackbar("Sat-Max", self.window_name, self.saturationMax, 255, self._mark_trackbars_dirty)
+        cv2.createTrackbar("Bright-Min", self.window_name, self.brightnessMin, 255, self._mark_trackbars_dirty)
+        cv2.createTrackbar("Bright-Max", self.window_name, self.brightnessMax, 255, self._mark_trackbars_dirty)
+
+    def _mark_trackbars_dirty(self, value):
+        self._trackbars_dirty = True
 
     def _setup_relay_controller(self):
-        self.relay_dict = {int(key): int(value) for key, value in self.config['Relays'].items()}
+        self.relay_dict = dict(self.cfg.relays)
         self.relay_controller = RelayController(relay_dict=self.relay_dict)
         self.logger = self.relay_controller.logger
 
     def _setup_video_source(self):
-        if len(self.config.get('System', 'input_file_or_directory')) > 0:
-            self.input_file_or_directory = self.config.get('System', 'input_file_or_directory')
+        if len(self.cfg.input_file_or_directory) > 0:
+            self.input_file_or_directory = self.cfg.input_file_or_directory
 
-        if len(self.config.get('System', 'input_file_or_directory')) > 0 and self.input_file_or_directory is not None:
+        if len(self.cfg.input_file_or_directory) > 0 and self.input_file_or_directory is not None:
             print('[WARNING] two paths to image/videos provided. Defaulting to the command line flag.')
 
         if self.input_file_or_directory:
             self.cam = FrameReader(
                 path=self.input_file_or_directory,
                 resolution=self.resolution,
-                loop_time=self.config.getint('Visualisation', 'image_loop_time')
+                loop_time=self.cfg.image_loop_time
             )
             self.frame_width, self.frame_height = self.cam.resolution
             self.logger.log_line(f'[INFO] Using {self.cam.input_type} from {self.input_file_or_directory}...', verbose=True)
@@ -159,13 +225,14 @@ class Owl:
                 time.sleep(2)
                 sys.exit(1)
 
+
     def _setup_data_collection(self):
-        self.sample_method = self.config.get('DataCollection', 'sample_method')
-        self.disable_detection = self.config.getboolean('DataCollection', 'disable_detection')
-        self.sample_frequency = self.config.getint('DataCollection', 'sample_frequency')
-        self.enable_device_save = self.config.getboolean('DataCollection', 'enable_device_save')
-        self.save_directory = self.config.get('DataCollection', 'save_directory')
-        self.camera_name = self.config.get('DataCollection', 'camera_name')
+        self.sample_method = self.cfg.sample_method
+        self.disable_detection = self.cfg.disable_detection
+        self.sample_frequency = self.cfg.sample_frequency
+        self.enable_device_save = self.cfg.enable_device_save
+        self.save_directory = self.cfg.save_directory
+        self.camera_name = self.cfg.camera_name
 
         self.indicators = StatusIndicator(save_directory=self.save_directory)
         self.save_subdirectory = self.indicators.setup_directories(enable_device_save=self.enable_device_save)
@@ -173,38 +240,95 @@ class Owl:
 
         self.image_recorder = ImageRecorder(save_directory=self.save_subdirectory, mode=self.sample_method)
 
+        # sampled frames go to a writer thread so the LED blink and recorder queueing stay off the detection loop
+        self.sample_queue = Queue(maxsize=4)
+        self.sample_thread = Thread(target=self._write_samples, daemon=True)
+        self.sample_thread.start()
+
+    def _write_samples(self):
+        while True:
+            sample = self.sample_queue.get()
+            if sample is None:
+                break
+
+            frame, frame_id, boxes, centres = sample
+            self.indicators.image_write_indicator()
+            self.image_recorder.add_frame(frame=frame, frame_id=frame_id, boxes=boxes, centres=centres)
+
     def _setup_lane_coordinates(self):
-        self.relay_num = self.config.getint('System', 'relay_num')
+        self.relay_num = self.cfg.relay_num
         self.yAct = int(0.01 * self.frame_height)
         self.lane_width = self.frame_width / self.relay_num
         self.lane_coords = {i: int(i * self.lane_width) for i in range(self.relay_num)}
 
+    def _refresh_detect(self):
+        self._detect = self._build_detect(self.weed_detector, self.cfg.algorithm)
+
+    def _build_detect(self, weed_detector, algorithm):
+        # everything but the frame is fixed between threshold changes, so bind it once rather than packing the
+        # keyword arguments every frame; _refresh_detect() rebuilds the closure whenever the thresholds change
+        show_display = self.show_display
+
+        if algorithm == 'gog':
+            confidence = self.cfg.confidence
+            submit = weed_detector.submit
+            get_result = weed_detector.get_result
+            in_flight = weed_detector.in_flight
+
+            def detect(frame, frame_id, capture_time):
+                # keep up to in_flight frames on the accelerator and collect the oldest once the window is full.
+                # Results trail the camera by a few frames, so they carry the capture time of their own frame
+                submit(frame, confidence, 63, frame_id, show_display, capture_time)
+                result = get_result(weed_detector.pending >= in_flight)
+                if result is None:
+                    return None, [], [], frame, None, capture_time
+
+                cnts, boxes, weed_centres, image_out, _, result_time = result
+                return cnts, boxes, weed_centres, frame if image_out is None else image_out, None, result_time
+
+            return detect
+
+        inference = weed_detector.inference
+        # positional order of GreenOnBrown.inference after the image
+        args = (self.exgMin, self.exgMax, self.hueMin, self.hueMax, self.brightnessMin, self.brightnessMax,
+                self.saturationMin, self.saturationMax, self.cfg.min_detection_area, show_display, algorithm,
+                self.cfg.invert_hue, 'WEED', self.cfg.detection_scale, False)
+
+        def detect(frame, frame_id, capture_time):
+            cnts, boxes, weed_centres, image_out = inference(frame, *args)
+            return cnts, boxes, weed_centres, image_out, weed_detector.threshold_image, capture_time
+
+        return detect
+
     def hoot(self):
-        algorithm = self.config.get('System', 'algorithm')
-        log_fps = self.config.getboolean('DataCollection', 'log_fps')
+        cfg = self.cfg
+        algorithm = cfg.algorithm
+        log_fps = cfg.log_fps
         if self.enable_controller:
-            self.disable_detection = not self.detection_state.value
-            self.sample_images = self.sample_state.value
+            controller_state = self.controller_state
+            self.disable_detection = not controller_state.detection
+            self.sample_images = controller_state.sampling
 
         # track FPS and framecount
         frame_count = 0
 
-        if log_fps:
-            fps = FPS().start()
+        # frames since fps_t0; a perf_counter read per report replaces a timestamp per frame
+        fps_count = 0
+        fps_t0 = time.perf_counter()
 
         try:
             if algorithm == 'gog':
                 from utils.greenongreen import GreenOnGreen
-                model_path = self.config.get('GreenOnGreen', 'model_path')
-                confidence = self.config.getfloat('GreenOnGreen', 'confidence')
+                model_path = cfg.model_path
 
                 weed_detector = GreenOnGreen(model_path=model_path)
 
             else:
-                min_detection_area = self.config.getint('GreenOnBrown', 'min_detection_area')
-                invert_hue = self.config.getboolean('GreenOnBrown', 'invert_hue')
+                weed_detector = GreenOnBrown(algorithm=algorithm, use_opencl=cfg.use_opencl,
+                                             adaptive_method=cfg.adaptive_method)
 
-                weed_detector = GreenOnBrown(algorithm=algorithm)
+            self.weed_detector = weed_detector
+            self._refresh_detect()
 
         except (ModuleNotFoundError, IndexError, FileNotFoundError, ValueError) as e:
             self._handle_exceptions(e, algorithm)
@@ -220,24 +344,39 @@ class Owl:
             self.relay_controller.vis = True
 
         try:
-            actuation_duration = self.config.getfloat('System', 'actuation_duration')
-            delay = self.config.getfloat('System', 'delay')
+            actuation_duration = cfg.actuation_duration
+            delay = cfg.delay
+            y_act = self.yAct
+            lane_width = self.lane_width
+            last_relay = self.relay_num - 1
+            save_text_origin = (20, int(self.frame_width * 0.72))
+
+            # bind the per-frame calls once so the loop skips the repeated attribute lookups
+            cam_read = self.cam.read
+            relay_receive = self.relay_controller.receive
+            if self.show_display:
+                ui_queue = self._ui_queue
+                key_queue = self._key_queue
+                free_displays = self._free_displays
+            threshold = None
+
+            # the overlay text is drawn onto a copy so the camera frame is never marked up; reuse one buffer for it
+            image_out_buf = None
 
             while True:
                 if self.enable_controller:
-                    self.disable_detection = not self.detection_state.value
-                    self.sample_images = self.sample_state.value
+                    self.disable_detection = not controller_state.detection
+                    self.sample_images = controller_state.sampling
 
-                frame = self.cam.read()
+                frame = cam_read()
 
                 if self.focus:
-                    grey = cv2.cvtColor(frame.copy(), cv2.COLOR_BGR2GRAY)
+                    grey = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
                     blurriness = fft_blur(grey, size=30)
 
                 if frame is None:
                     if log_fps:
-                        fps.stop()
-                        print(f"[INFO] Stopped. Approximate FPS: {fps.fps():.2f}")
+                        self._report_fps(fps_count, fps_t0, prefix='Stopped. ')
                         self.stop()
                         break
                     else:
@@ -245,79 +384,48 @@ class Owl:
                         self.stop()
                         break
 
-                # retrieve the trackbar positions for thresholds
-                if self.show_display:
-                    self.exgMin = cv2.getTrackbarPos("ExG-Min", self.window_name)
-                    self.exgMax = cv2.getTrackbarPos("ExG-Max", self.window_name)
-                    self.hueMin = cv2.getTrackbarPos("Hue-Min", self.window_name)
-                    self.hueMax = cv2.getTrackbarPos("Hue-Max", self.window_name)
-                    self.saturationMin = cv2.getTrackbarPos("Sat-Min", self.window_name)
-                    self.saturationMax = cv2.getTrackbarPos("Sat-Max", self.window_name)
-                    self.brightnessMin = cv2.getTrackbarPos("Bright-Min", self.window_name)
-                    self.brightnessMax = cv2.getTrackbarPos("Bright-Max", self.window_name)
-
-                else:
-                    # this leaves it open to adding dials for sensitivity. Static at the moment, but could be dynamic
-                    self.update(exgMin=self.exgMin, exgMax=self.exgMax)  # add in update values here
-
-                # pass image, thresholds to green_on_brown function
+                # data collection runs with detection off skip the threshold refresh and detection entirely and go
+                # straight from the camera read to the sampler
                 if not self.disable_detection:
-                    if algorithm == 'gog':
-                        cnts, boxes, weed_centres, image_out = weed_detector.inference(frame,
-                                                                                       confidence=confidence,
-                                                                                       filter_id=63)
-                    else:
-                        cnts, boxes, weed_centres, image_out = weed_detector.inference(frame,
-                                                                                       exgMin=self.exgMin,
-                                                                                       exgMax=self.exgMax,
-                                                                                       hueMin=self.hueMin,
-                                                                                       hueMax=self.hueMax,
-                                                                                       saturationMin=self.saturationMin,
-                                                                                       saturationMax=self.saturationMax,
-                                                                                       brightnessMin=self.brightnessMin,
-                                                                                       brightnessMax=self.brightnessMax,
-                                                                                       show_display=self.show_display,
-                                                                                       algorithm=algorithm,
-                                                                                       min_detection_area=min_detection_area,
-                                                                                       invert_hue=invert_hue,
-                                                                                       label='WEED')
-
-                    # Precompute the integer lane coordinates for reuse
-                    lane_coords_int = {k: int(v) for k, v in self.lane_coords.items()}
+                    if self.show_display:
+                        self._apply_trackbars()
+
+                    # pass image, thresholds to green_on_brown function
+                    # actuation is timed from when the frame was captured, not from when its result arrived
+                    detection = self._detect(frame, frame_count, time.time())
+                    cnts, boxes, weed_centres, image_out, threshold, actuation_time = detection
 
                     if len(weed_centres) > 0 and self.enable_controller:
                         self.basic_controller.weed_detect_indicator()
 
-                    # loop over the weed centres
-                    for centre in weed_centres:
-                        if centre[1] > self.yAct:
-                            actuation_time = time.time()
-                            centre_x = centre[0]
-
-                            for i in range(self.relay_num):
-                                lane_start = lane_coords_int[i]
-                                lane_end = lane_start + self.lane_width
+                    if weed_centres:
+                        # lanes are equal width, so every relay index comes from one vectorised division
+                        centres = np.asarray(weed_centres, dtype=np.int32)
+                        # clip both ends: boxes cut off at the frame edge can put a centre just outside it, and a
+                        # negative lane would index the last relay
+                        relays = np.clip(centres[centres[:, 1] > y_act, 0] // lane_width, 0, last_relay)
 
-                                if lane_start <= centre_x < lane_end:
-                                    self.relay_controller.receive(relay=i, delay=delay,
-                                                                  time_stamp=actuation_time,
-                                                                  duration=actuation_duration)
+                        for relay in relays.astype(np.int32).tolist():
+                            relay_receive(relay=relay, delay=delay,
+                                          time_stamp=actuation_time,
+                                          duration=actuation_duration)
 
                 ##### IMAGE SAMPLER #####
                 # record sample images if required of weeds detected. sampleFreq specifies how often
                 if self.sample_images:
                     # only record every sampleFreq number of frames. If sample_frequency = 60, this will activate every 60th frame
                     if frame_count % self.sample_frequency == 0:
-                        self.indicators.image_write_indicator()
-
-                        if self.sample_method == 'whole':
-                            self.image_recorder.add_frame(frame=frame, frame_id=frame_count, boxes=None, centres=None)
-
-                        elif self.sample_method != 'whole' and not self.disable_detection:
-                            self.image_recorder.add_frame(frame=frame, frame_id=frame_count, boxes=boxes,
-                                                          centres=weed_centres)
+                        if self.sample_method != 'whole' and not self.disable_detection:
+                            sample = (frame.copy(), frame_count, boxes, weed_centres)
                         else:
-                            self.image_recorder.add_frame(frame=frame, frame_id=frame_count, boxes=None, centres=None)
+                            sample = (frame.copy(), frame_count, None, None)
+
+                        # the copy is needed as camera frames come from a reused pool; drop the sample if the
+                        # writer is behind rather than stall detection
+                        try:
+                            self.sample_queue.put_nowait(sample)
+                        except Full:
+                            pass
 
                     if self.indicators.DRIVE_FULL:
                         self.sample_images = False
@@ -326,48 +434,72 @@ class Owl:
                 frame_count = frame_count + 1 if frame_count < 900 else 1
 
                 if log_fps and frame_count % 900 == 0:
-                    fps.stop()
-                    self.logger.log_line(f"[INFO] Approximate FPS: {fps.fps():.2f}", verbose=True)
-                    fps = FPS().start()
+                    self._report_fps(fps_count, fps_t0)
+                    fps_count = 0
+                    fps_t0 = time.perf_counter()
 
                 # update the framerate counter
-                if log_fps:
-                    fps.update()
+                fps_count += 1
 
                 if self.show_display:
                     if self.disable_detection:
-                        image_out = frame.copy()
+                        if image_out_buf is None or image_out_buf.shape != frame.shape:
+                            image_out_buf = np.empty_like(frame)
+                        np.copyto(image_out_buf, frame)
+                        image_out = image_out_buf
 
                     cv2.putText(image_out, f'OWL-gorithm: {algorithm}', (20, 35), cv2.FONT_HERSHEY_SIMPLEX, 0.75,
                                 (80, 80, 255), 1)
                     cv2.putText(image_out, f'Press "S" to save {algorithm} thresholds to file.',
-                                (20, int(image_out.shape[1 ] *0.72)), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (80, 80, 255), 1)
+                                save_text_origin, cv2.FONT_HERSHEY_SIMPLEX, 0.6, (80, 80, 255), 1)
                     if self.focus:
                         cv2.putText(image_out, f'Blurriness: {blurriness:.2f}', (20, 70), cv2.FONT_HERSHEY_SIMPLEX, 1,
                                     (80, 80, 255), 1)
 
-                    cv2.imshow("Detection Output", imutils.resize(image_out, width=600))
-
-                k = cv2.waitKey(1) & 0xFF
-                if k == ord('s'):
-                    self.save_parameters()
-                    self.logger.log_line("[INFO] Parameters saved.", verbose=True)
-
-                if k == 27:
-                    if log_fps:
-                        fps.stop()
-                        self.logger.log_line(f"[INFO] Approximate FPS: {fps.fps():.2f}", verbose=True)
-                    if self.show_display:
+                    # if the UI thread still holds every display buffer it is behind, so skip showing this frame
+                    try:
+                        display = free_displays.get_nowait()
+                    except Empty:
+                        display = None
+
+                    if display is not None:
+                        cv2.resize(image_out, self._disp_size, dst=display, interpolation=self._disp_interpolation)
+                        item = (display, threshold.copy() if threshold is not None and not self.disable_detection
+                                else None)
+                        try:
+                            ui_queue.put_nowait(item)
+                        except Full:
+                            # drop the stale frame the UI has not picked up yet; hoot() is the only producer, so
+                            # the slot is free again afterwards
+                            try:
+                                free_displays.put(ui_queue.get_nowait()[0])
+                            except Empty:
+                                pass
+                            ui_queue.put_nowait(item)
+
+                    try:
+                        k = key_queue.get_nowait()
+                    except Empty:
+                        k = None
+
+                    if k == ord('s'):
+                        # sliders may have moved while detection was off, so pick them up before saving
+                        self._apply_trackbars()
+                        if self.save_parameters():
+                            self.logger.log_line("[INFO] Parameters saved.", verbose=True)
+
+                    if k == 27:
+                        if log_fps:
+                            self._report_fps(fps_count, fps_t0)
                         self.relay_controller.relay_vis.close()
 
-                    self.logger.log_line("[INFO] Stopped.", verbose=True)
-                    self.stop()
-                    break
+                        self.logger.log_line("[INFO] Stopped.", verbose=True)
+                        self.stop()
+                        break
 
         except KeyboardInterrupt:
             if log_fps:
-                fps.stop()
-                self.logger.log_line(f"[INFO] Approximate FPS: {fps.fps():.2f}", verbose=True)
+                self._report_fps(fps_count, fps_t0)
             if self.show_display:
                 self.relay_controller.relay_vis.close()
             self.logger.log_line("[INFO] Stopped.", verbose=True)
@@ -385,27 +517,50 @@ class Owl:
 
         self.cam.stop()
 
+        # only the GreenOnGreen detector holds device streams and worker threads that need closing
+        if hasattr(self.weed_detector, 'close'):
+            self.weed_detector.close()
+
         if self.enable_controller:
             self.basic_controller.stop()
-            self.basic_controller_process.join()
+            self.basic_controller_thread.join()
 
         if self.sample_images:
+            self.sample_queue.put(None)
+            self.sample_thread.join(timeout=5)
             self.indicators.stop()
             self.image_recorder.stop()
 
         if self.show_display:
-            cv2.destroyAllWindows()
+            # the UI thread closes its own windows on the way out
+            self._ui_running.clear()
+            self._ui_thread.join(timeout=1)
 
         sys.exit()
 
+    def _report_fps(self, fps_count, fps_t0, prefix=''):
+        elapsed = time.perf_counter() - fps_t0
+        fps = fps_count / elapsed if elapsed > 0 else 0.0
+        self.logger.log_line(f"[INFO] {prefix}Approximate FPS: {fps:.2f}", verbose=True)
+
     def update(self, exgMin=30, exgMax=180):
         self.exgMin = exgMin
         self.exgMax = exgMax
+        # the detect closure captures the thresholds, so rebuild it once a detector exists
+        if self.weed_detector is not None:
+            self._refresh_detect()
 
     def update_delay(self, delay=0):
         # if GPS added, could use it here to return a delay variable based on speed.
         return delay
 
+    def _config_digest(self):
+        # serialise once; the text is reused for the write and the digest decides whether a write is needed
+        buffer = io.StringIO()
+        self.config.write(buffer)
+        config_text = buffer.getvalue()
+        return config_text, hashlib.blake2b(config_text.encode(), digest_size=16).digest()
+
     def save_parameters(self):
         timestamp = datetime.now().strftime('%Y%m%d-%H%M%S')
         new_config_filename = f"{timestamp}_{self._config_path.name}"
@@ -424,11 +579,18 @@ class Owl:
         self.config.set('GreenOnBrown', 'brightnessMin', str(self.brightnessMin))
         self.config.set('GreenOnBrown', 'brightnessMax', str(self.brightnessMax))
 
+        config_text, config_hash = self._config_digest()
+        if config_hash == self._last_config_hash:
+            print("[INFO] Configuration unchanged, skipping save.")
+            return False
+
         # Write the updated configuration to the new file with a timestamped filename
         with open(new_config_path, 'w') as configfile:
-            self.config.write(configfile)
+            configfile.write(config_text)
 
+        self._last_config_hash = config_hash
         print(f"[INFO] Configuration saved to {new_config_path}")
+        return True
 
     def _handle_exceptions(self, e, algorithm):
         # handle exceptions cleanly
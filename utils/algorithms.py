@@ -1,6 +1,14 @@
 import numpy as np
 import cv2
 
+# numba is optional; without it the algorithms fall back to their numpy implementations
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+
+except ImportError:
+    NUMBA_AVAILABLE = False
+
 ### Adding a new algorithm ###
 """
 To add a new algorithm the only requirement is that it accepts a BGR (opencv) image and returns a grayscale
@@ -9,23 +17,68 @@ as it has already been thresholded.
 """
 ##############################
 
+# ExG as a single BGR -> grey transform; cv2.transform saturates to uint8, which is the 0-255 clip
+_EXG_WEIGHTS = np.array([[-1, 2, -1]], dtype=np.float32)
+
+if NUMBA_AVAILABLE:
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _exg_kernel(image, image_out):
+        # fused 2G - R - B with the 0-255 clip, one pass over the uint8 BGR frame and no temporaries
+        rows, cols = image_out.shape
+        for y in prange(rows):
+            for x in range(cols):
+                value = 2 * np.int32(image[y, x, 1]) - np.int32(image[y, x, 2]) - np.int32(image[y, x, 0])
+                if value < 0:
+                    value = 0
+                elif value > 255:
+                    value = 255
+                image_out[y, x] = value
+
+        return image_out
+
+    @njit(parallel=True, cache=True)
+    def _exhsv_kernel(image, hsv_image, hue_min, hue_max, sat_min, sat_max, val_min, val_max, invert_hue, image_out):
+        # standardised ExG gated by the HSV thresholds in one pass, instead of two full-frame masks and an AND
+        rows, cols = image_out.shape
+        for y in prange(rows):
+            for x in range(cols):
+                hue_pass = hue_min <= hsv_image[y, x, 0] <= hue_max
+                if (hue_pass == invert_hue
+                        or not sat_min <= hsv_image[y, x, 1] <= sat_max
+                        or not val_min <= hsv_image[y, x, 2] <= val_max):
+                    image_out[y, x] = 0
+                    continue
+
+                # float32 constants throughout; a bare Python int or float promotes the arithmetic to float64
+                blue = np.float32(image[y, x, 0])
+                green = np.float32(image[y, x, 1])
+                red = np.float32(image[y, x, 2])
+                channel_sum = np.float32(red + green + blue)
+                if channel_sum == np.float32(0):
+                    channel_sum = np.float32(1)
+
+                value = np.float32(255) * (np.float32(2) * (green / channel_sum) - red / channel_sum
+                                           - blue / channel_sum)
+                if value < np.float32(0):
+                    value = np.float32(0)
+                elif value > np.float32(255):
+                    value = np.float32(255)
+                image_out[y, x] = np.uint8(value)
+
+        return image_out
+
 def exg(image):
     """
     Takes an image and processes it using ExG. Returns a single channel exG output.
     Developed by Woebbecke et al. 1995.
     :return: grayscale image
     """
-    # using array slicing to split into channels
-    blue = image[:, :, 0].astype(np.float32)
-    green = image[:, :, 1].astype(np.float32)
-    red = image[:, :, 2].astype(np.float32)
-    # cv2.imshow('blue', blue.astype('uint8'))
-    # cv2.imshow('green', green.astype('uint8'))
-    # cv2.imshow('red', red.astype('uint8'))
+    if NUMBA_AVAILABLE:
+        return _exg_kernel(image, np.empty(image.shape[:2], dtype=np.uint8))
 
-    image_out = 2 * green - red - blue
-    image_out = np.clip(image_out, 0, 255)
-    image_out = image_out.astype('uint8')
+    # weight and sum the three channels in one pass over the frame rather than splitting them into int16 copies.
+    # The weights are small integers, so the float accumulation is exact before the saturating cast
+    image_out = cv2.transform(image, _EXG_WEIGHTS)
 
     # cv2.imshow('ExG', imgOut)
     return image_out
@@ -93,6 +146,11 @@ def exg_standardised_hue(image,
     :param invert_hue: inverts the hue threshold to exclude anything within the thresholds
     :return: returns a grayscale image
     '''
+    if NUMBA_AVAILABLE:
+        hsv_image = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
+        return _exhsv_kernel(image, hsv_image, hueMin, hueMax, saturationMin, saturationMax,
+                             brightnessMin, brightnessMax, invert_hue,
+                             np.empty(image.shape[:2], dtype=np.uint8))
 
     blue = image[:, :, 0].astype(np.float32)
     green = image[:, :, 1].astype(np.float32)
@@ -116,7 +174,7 @@ def exg_standardised_hue(image,
                        brightnessMin=brightnessMin, brightnessMax=brightnessMax,
                        saturationMin=saturationMin, saturationMax=saturationMax,
                        invert_hue=invert_hue)
-    image_out = hsv_thresh & image_out
+    image_out = cv2.bitwise_and(hsv_thresh, image_out)
     # cv2.imshow('exhu', imgOut)
 
     return image_out
@@ -159,23 +217,18 @@ def hsv(image,
     :return: returns a binary image and boolean thresholded or not
     '''
     image = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
-    hue = image[:, :, 0]
-    sat = image[:, :, 1]
-    val = image[:, :, 2]
-
-    hue_thresh = cv2.inRange(hue, hueMin, hueMax)
-    sat_thresh = cv2.inRange(sat, saturationMin, saturationMax)
-    val_thresh = cv2.inRange(val, brightnessMin, brightnessMax)
 
     # allow users to select purple/red colour ranges by excluding green
     if invert_hue:
-        hue_thresh = cv2.bitwise_not(hue_thresh)
+        sat_val_thresh = cv2.inRange(image, (0, saturationMin, brightnessMin), (255, saturationMax, brightnessMax))
+        # hue-only range on the full image rather than a channel slice, so this also runs on a cv2.UMat
+        hue_thresh = cv2.bitwise_not(cv2.inRange(image, (hueMin, 0, 0), (hueMax, 255, 255)))
+        out_thresh = cv2.bitwise_and(sat_val_thresh, hue_thresh)
 
-    # cv2.imshow('hue', hueThresh)
-    # cv2.imshow('sat', satThresh)
-    # cv2.imshow('val', valThresh)
+    else:
+        # all three channel ranges checked in a single pass
+        out_thresh = cv2.inRange(image, (hueMin, saturationMin, brightnessMin), (hueMax, saturationMax, brightnessMax))
 
-    out_thresh = sat_thresh & val_thresh & hue_thresh
     # cv2.imshow('HSV Out', outThresh)
     return out_thresh, True
 
@@ -1,3 +1,4 @@
+from dataclasses import dataclass
 import time
 import platform
 import warnings
@@ -20,15 +21,21 @@ else:
     warnings.warn(warning_message, RuntimeWarning)
     testing = True
 
+# switch state shared with the main loop. The controller is the only writer and each flag is a single attribute
+# store, so the main loop can read them every frame without a lock.
+@dataclass(slots=True)
+class ControllerState:
+    detection: bool = False
+    sampling: bool = False
+
 
 class BasicController:
-    def __init__(self, detection_state, sample_state, stop_flag, switch_purpose='detection', switch_board_pin='BOARD36',
+    def __init__(self, controller_state, stop_flag, switch_purpose='detection', switch_board_pin='BOARD36',
                  status_LED_board_pin='BOARD37', bounce_time=1.0):
         self.switch = Button(switch_board_pin, bounce_time=bounce_time)
         self.switch_purpose = switch_purpose
 
-        self.detection_state = detection_state
-        self.sample_state = sample_state
+        self.controller_state = controller_state
 
         self.stop_flag = stop_flag
 
@@ -51,18 +58,14 @@ class BasicController:
             self.disable_current_purpose()
 
     def toggle_on(self):
-        with self.detection_state.get_lock():
-            self.detection_state.value = False
-
-        with self.sample_state.get_lock():
-            self.sample_state.value = True
+        # detection off, sampling on
+        self.controller_state.detection = False
+        self.controller_state.sampling = True
 
     def toggle_off(self):
-        with self.detection_state.get_lock():
-            self.detection_state.value = True
-
-        with self.sample_state.get_lock():
-            self.sample_state.value = False
+        # detection on, sampling off
+        self.controller_state.sampling = False
+        self.controller_state.detection = True
 
     def enable_current_purpose(self):
         if self.switch_purpose == 'detection':
@@ -82,12 +85,11 @@ class BasicController:
         self.detect_status_LED.blink(on_time=0.1, n=1, background=True)
 
     def run(self):
-        while not self.stop_flag.value:
-            time.sleep(0.1)  # sleep to reduce CPU usage
+        # gpiozero delivers the switch callbacks on its own thread, so this only has to wait for stop()
+        self.stop_flag.wait()
 
     def stop(self):
-        with self.stop_flag.get_lock():
-            self.stop_flag.value = True
+        self.stop_flag.set()
 
 
 class SensitivitySelector:
@@ -0,0 +1,111 @@
+from configparser import ConfigParser
+from dataclasses import dataclass
+
+
+@dataclass(slots=True, frozen=True)
+class OwlConfig:
+    # System
+    algorithm: str
+    input_file_or_directory: str
+    relay_num: int
+    actuation_duration: float
+    delay: float
+
+    # Controller
+    enable_controller: bool
+    switch_purpose: str
+    switch_pin: int
+
+    # Visualisation
+    image_loop_time: int
+
+    # Camera
+    resolution_width: int
+    resolution_height: int
+    exp_compensation: int
+
+    # GreenOnGreen
+    model_path: str
+    confidence: float
+
+    # GreenOnBrown
+    exg_min: int
+    exg_max: int
+    hue_min: int
+    hue_max: int
+    saturation_min: int
+    saturation_max: int
+    brightness_min: int
+    brightness_max: int
+    min_detection_area: int
+    invert_hue: bool
+    detection_scale: float
+    use_opencl: bool
+    adaptive_method: str
+
+    # DataCollection
+    sample_images: bool
+    sample_method: str
+    sample_frequency: int
+    enable_device_save: bool
+    save_directory: str
+    disable_detection: bool
+    log_fps: bool
+    camera_name: str
+
+    # Relays as (relay_id, board_pin) pairs
+    relays: tuple
+
+    @classmethod
+    def from_parser(cls, config):
+        return cls(
+            algorithm=config.get('System', 'algorithm'),
+            input_file_or_directory=config.get('System', 'input_file_or_directory'),
+            relay_num=config.getint('System', 'relay_num'),
+            actuation_duration=config.getfloat('System', 'actuation_duration'),
+            delay=config.getfloat('System', 'delay'),
+
+            enable_controller=config.getboolean('Controller', 'enable_controller'),
+            switch_purpose=config.get('Controller', 'switch_purpose'),
+            switch_pin=config.getint('Controller', 'switch_pin'),
+
+            image_loop_time=config.getint('Visualisation', 'image_loop_time'),
+
+            resolution_width=config.getint('Camera', 'resolution_width'),
+            resolution_height=config.getint('Camera', 'resolution_height'),
+            exp_compensation=config.getint('Camera', 'exp_compensation'),
+
+            model_path=config.get('GreenOnGreen', 'model_path', fallback='models'),
+            confidence=config.getfloat('GreenOnGreen', 'confidence', fallback=0.5),
+
+            exg_min=config.getint('GreenOnBrown', 'exgMin'),
+            exg_max=config.getint('GreenOnBrown', 'exgMax'),
+            hue_min=config.getint('GreenOnBrown', 'hueMin'),
+            hue_max=config.getint('GreenOnBrown', 'hueMax'),
+            saturation_min=config.getint('GreenOnBrown', 'saturationMin'),
+            saturation_max=config.getint('GreenOnBrown', 'saturationMax'),
+            brightness_min=config.getint('GreenOnBrown', 'brightnessMin'),
+            brightness_max=config.getint('GreenOnBrown', 'brightnessMax'),
+            min_detection_area=config.getint('GreenOnBrown', 'min_detection_area'),
+            invert_hue=config.getboolean('GreenOnBrown', 'invert_hue'),
+            detection_scale=config.getfloat('GreenOnBrown', 'detection_scale', fallback=1.0),
+            use_opencl=config.getboolean('GreenOnBrown', 'use_opencl', fallback=False),
+            adaptive_method=config.get('GreenOnBrown', 'adaptive_method', fallback='gaussian'),
+
+            sample_images=config.getboolean('DataCollection', 'sample_images', fallback=False),
+            sample_method=config.get('DataCollection', 'sample_method', fallback='whole'),
+            sample_frequency=config.getint('DataCollection', 'sample_frequency', fallback=30),
+            enable_device_save=config.getboolean('DataCollection', 'enable_device_save', fallback=False),
+            save_directory=config.get('DataCollection', 'save_directory', fallback='/media/owl/SanDisk'),
+            disable_detection=config.getboolean('DataCollection', 'disable_detection', fallback=False),
+            log_fps=config.getboolean('DataCollection', 'log_fps', fallback=False),
+            camera_name=config.get('DataCollection', 'camera_name', fallback='cam1'),
+
+            relays=tuple((int(key), int(value)) for key, value in config['Relays'].items())
+        )
+
+    @classmethod
+    def from_ini(cls, path):
+        config = ConfigParser()
+        config.read(path)
+        return cls.from_parser(config)
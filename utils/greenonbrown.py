@@ -3,78 +3,174 @@ from utils.algorithms import exg, exg_standardised, exg_standardised_hue, hsv, e
 import numpy as np
 import cv2
 
+# shared by every detector instance, so built once at import
+_KERNEL = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (3, 3))
+
+# single-pass close for binary (hsv) masks; rectangular kernels use OpenCV's separable row/column morphology
+_MASK_KERNEL = cv2.getStructuringElement(cv2.MORPH_RECT, (7, 7))
+
+# adaptive threshold weighting of the 31x31 neighbourhood. Gaussian is the default; mean uses a cheaper box filter
+# but can merge neighbouring plants into one blob, so it has to be chosen explicitly
+_ADAPTIVE_METHODS = {
+    'gaussian': cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
+    'mean': cv2.ADAPTIVE_THRESH_MEAN_C
+}
+
+# Dictionary mapping algorithm names to functions
+_ALGORITHMS = {
+    'exg': exg,
+    'exgr': exgr,
+    'maxg': maxg,
+    'nexg': exg_standardised,
+    'exhsv': exg_standardised_hue,
+    'hsv': hsv,
+    'gndvi': gndvi
+}
 
 class GreenOnBrown:
-    def __init__(self, algorithm='exg', label_file='models/labels.txt'):
+    def __init__(self, algorithm='exg', label_file='models/labels.txt', use_opencl=False, adaptive_method='gaussian'):
         self.algorithm = algorithm
+        if adaptive_method not in _ADAPTIVE_METHODS:
+            raise ValueError(f"[ERROR] Invalid adaptive_method '{adaptive_method}'. Use 'gaussian' or 'mean'.")
+        self.adaptive_method = _ADAPTIVE_METHODS[adaptive_method]
         self.weed_centres = None
         self.boxes = None
-        self.kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (3, 3))
-
-        # Dictionary mapping algorithm names to functions
-        self.algorithms = {
-            'exg': exg,
-            'exgr': exgr,
-            'maxg': maxg,
-            'nexg': exg_standardised,
-            'exhsv': exg_standardised_hue,
-            'hsv': hsv,
-            'gndvi': gndvi
-        }
+        self.kernel = _KERNEL
+        self.algorithms = _ALGORITHMS
+
+        # per-frame output buffers, allocated on first use and reused while the frame size stays the same
+        self._buffers = {}
+
+        # optionally run the threshold and morphology stages through OpenCV's OpenCL (T-API) path
+        self.use_opencl = use_opencl and cv2.ocl.haveOpenCL()
+        if self.use_opencl:
+            cv2.ocl.setUseOpenCL(True)
+            print('[INFO] OpenCL available, using it for thresholding and morphology.')
+        elif use_opencl:
+            print('[INFO] OpenCL requested but not available, continuing on the CPU.')
+
+    def _buffer(self, name, shape):
+        buffer = self._buffers.get(name)
+        if buffer is None or buffer.shape != shape:
+            buffer = np.empty(shape, dtype=np.uint8)
+            self._buffers[name] = buffer
+
+        return buffer
+
+    def _threshold(self, output, threshed_already):
+        if self.use_opencl:
+            # UMat outputs are allocated by OpenCL, so the preallocated buffers are skipped on this path
+            if not threshed_already:
+                threshold_out = cv2.adaptiveThreshold(cv2.UMat(output), 255, self.adaptive_method,
+                                                      cv2.THRESH_BINARY_INV, 31, 2)
+                threshold_out = cv2.morphologyEx(threshold_out, cv2.MORPH_CLOSE, _KERNEL, iterations=1)
+            else:
+                # the hsv mask is already a UMat when it was built on the device in inference()
+                mask = output if isinstance(output, cv2.UMat) else cv2.UMat(output)
+                threshold_out = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, _MASK_KERNEL)
+
+            # contour finding runs on the CPU
+            threshold_out = threshold_out.get()
+
+        elif not threshed_already:
+            # the clipped output is still greyscale, so it needs thresholding
+            threshold_out = cv2.adaptiveThreshold(output, 255, self.adaptive_method, cv2.THRESH_BINARY_INV,
+                                                  31, 2, dst=self._buffer('threshold', output.shape))
+            # threshold_out = cv2.threshold(output, exgMin, exgMax, cv2.THRESH_BINARY)
+            threshold_out = cv2.morphologyEx(threshold_out, cv2.MORPH_CLOSE, _KERNEL, iterations=1,
+                                             dst=self._buffer('closed', output.shape))
+        else:
+            threshold_out = cv2.morphologyEx(output, cv2.MORPH_CLOSE, _MASK_KERNEL,
+                                             dst=self._buffer('closed', output.shape))
+
+        return threshold_out
 
     def inference(self, image, exgMin=30, exgMax=250, hueMin=30, hueMax=90, brightnessMin=5, brightnessMax=200,
                   saturationMin=30, saturationMax=255, min_detection_area=1, show_display=False, algorithm='exg',
-                  invert_hue=False, label='WEED'):
+                  invert_hue=False, label='WEED', detection_scale=1.0, show_threshold=True):
         threshed_already = False
+        detection_image = image
+
+        # with OpenCL the frame is uploaded once, so the downscale (and for hsv the colour conversion and range
+        # check) run on the device as well; the numpy-based indices need it back on the host
+        on_device = self.use_opencl and (algorithm == 'hsv' or detection_scale != 1.0)
+        if on_device:
+            detection_image = cv2.UMat(image)
+
+        # optionally detect on a downscaled copy; boxes and centres are mapped back to full resolution below
+        if detection_scale != 1.0:
+            detection_image = cv2.resize(detection_image, None, fx=detection_scale, fy=detection_scale,
+                                         interpolation=cv2.INTER_AREA)
+            min_detection_area *= detection_scale * detection_scale
+
+        if on_device and algorithm != 'hsv':
+            detection_image = detection_image.get()
 
         # Retrieve the function based on the algorithm name
-        func = self.algorithms.get(algorithm, exg_standardised_hue)
+        func = _ALGORITHMS.get(algorithm, exg_standardised_hue)
 
         # Handle special cases for functions with additional parameters
         if algorithm == 'exhsv':
-            output = func(image, hueMin=hueMin, hueMax=hueMax, brightnessMin=brightnessMin,
+            output = func(detection_image, hueMin=hueMin, hueMax=hueMax, brightnessMin=brightnessMin,
                           brightnessMax=brightnessMax, saturationMin=saturationMin,
                           saturationMax=saturationMax, invert_hue=invert_hue)
         elif algorithm == 'hsv':
-            output, threshed_already = func(image, hueMin=hueMin, hueMax=hueMax, brightnessMin=brightnessMin,
+            output, threshed_already = func(detection_image, hueMin=hueMin, hueMax=hueMax, brightnessMin=brightnessMin,
                                             brightnessMax=brightnessMax, saturationMin=saturationMin,
                                             saturationMax=saturationMax, invert_hue=invert_hue)
         else:
-            output = func(image)
+            output = func(detection_image)
 
         self.weed_centres = []
         self.boxes = []
+        self.threshold_image = None
 
         if not threshed_already:
-            output = np.clip(output, exgMin, exgMax)
-            output = np.uint8(np.abs(output))
+            # every algorithm already returns uint8, so clip in place in a single pass
+            np.clip(output, exgMin, exgMax, out=output)
             if show_display:
-                cv2.imshow("HSV Threshold on ExG", output)
-            threshold_out = cv2.adaptiveThreshold(output, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY_INV,
-                                                  31, 2)
-            # threshold_out = cv2.threshold(output, exgMin, exgMax, cv2.THRESH_BINARY)
-            threshold_out = cv2.morphologyEx(threshold_out, cv2.MORPH_CLOSE, self.kernel, iterations=1)
+                # callers that draw from their own UI thread pass show_threshold=False and show this themselves
+                self.threshold_image = output
+                if show_threshold:
+                    cv2.imshow("HSV Threshold on ExG", output)
+
+        # a blank binary mask, or a greyscale index clipped flat, cannot produce a detection, so skip the
+        # threshold, morphology and contour stages on bare-soil frames
+        if threshed_already:
+            blank = cv2.countNonZero(output) == 0
         else:
-            threshold_out = cv2.morphologyEx(output, cv2.MORPH_CLOSE, self.kernel, iterations=5)
+            min_value, max_value, _, _ = cv2.minMaxLoc(output)
+            blank = min_value == max_value
 
-        contours, _ = cv2.findContours(threshold_out, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        if blank:
+            contours = ()
+        else:
+            threshold_out = self._threshold(output, threshed_already)
+            contours, _ = cv2.findContours(threshold_out, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
 
-        for c in contours:
-            if cv2.contourArea(c) > min_detection_area:
-                startX, startY, boxW, boxH = cv2.boundingRect(c)
-                self.boxes.append([startX, startY, boxW, boxH])
-                centerX = int(startX + (boxW / 2))
-                centerY = int(startY + (boxH / 2))
-                self.weed_centres.append([centerX, centerY])
+        if contours:
+            # min_detection_area is a polygon area, so filter on contourArea first and only run boundingRect for
+            # kept contours, then find the centres in one go
+            areas = np.fromiter((cv2.contourArea(c) for c in contours), dtype=np.float32, count=len(contours))
+            keep = np.flatnonzero(areas > min_detection_area)
+            if keep.size:
+                rects = np.array([cv2.boundingRect(contours[i]) for i in keep], dtype=np.int32)
+                if detection_scale != 1.0:
+                    rects = (rects / detection_scale).astype(np.int32)
+                centres = rects[:, :2] + rects[:, 2:] // 2
+                self.boxes = rects.tolist()
+                self.weed_centres = centres.tolist()
 
         if show_display:
-            image_out = image.copy()
+            # the annotated frame is only shown, never kept, so one display buffer is reused every frame
+            image_out = self._buffer('display', image.shape)
+            np.copyto(image_out, image)
             for box in self.boxes:
                 startX, startY, boxW, boxH = box
                 endX = startX + boxW
                 endY = startY + boxH
                 cv2.putText(image_out, label, (startX, startY + 30), cv2.FONT_HERSHEY_SIMPLEX, 1.0, (255, 0, 0), 2)
-                cv2.rectangle(image_out, (int(startX), int(startY)), (endX, endY), (0, 0, 255), 2)
+                cv2.rectangle(image_out, (startX, startY), (endX, endY), (0, 0, 255), 2)
 
             return contours, self.boxes, self.weed_centres, image_out
 
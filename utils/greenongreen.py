@@ -1,10 +1,13 @@
-from hailo_platform import VDevice, HEF, InputVStreams, OutputVStreams
+from contextlib import ExitStack
+from threading import Thread
+from queue import Queue, Empty
 from pathlib import Path
+import time
 import cv2
 import numpy as np
 
 class GreenOnGreen:
-    def __init__(self, model_path='models', label_file='models/labels.txt'):
+    def __init__(self, model_path='models', label_file='models/labels.txt', in_flight=3):
         if model_path is None:
             print('[WARNING] No model directory or path provided with --model-path flag. '
                   'Attempting to load from default...')
@@ -32,6 +35,10 @@ class GreenOnGreen:
         # Read labels
         self.labels = self.read_label_file(label_file)
 
+        # the Hailo runtime pulls in large shared libraries, so only load it once a detector is actually built
+        from hailo_platform import (VDevice, HEF, InputVStreams, OutputVStreams, InputVStreamParams,
+                                    OutputVStreamParams, FormatType)
+
         # Load HEF model
         self.hef = HEF(self.model_path.as_posix())
 
@@ -57,6 +64,43 @@ class GreenOnGreen:
         for info in self.output_vstream_infos:
             print(f"Name: {info.name}, Shape: {info.shape}")
 
+        # the output layout is fixed by the HEF, so resolve the tensor positions once and fail here if any is missing
+        required_outputs = ('detection_boxes', 'detection_classes', 'detection_scores')
+        missing_outputs = [name for name in required_outputs if name not in self.output_names]
+        if missing_outputs:
+            raise ValueError(f"[ERROR] Model is missing output tensors: {', '.join(missing_outputs)}")
+        self._box_idx, self._cls_idx, self._score_idx = (self.output_names.index(name) for name in required_outputs)
+
+        # open the vstreams once and keep the network group active for the lifetime of the detector
+        self._streams = ExitStack()
+        input_params = InputVStreamParams.make(self.network_group, format_type=FormatType.UINT8)
+        output_params = OutputVStreamParams.make(self.network_group, format_type=FormatType.FLOAT32)
+        self.input_vstreams = self._streams.enter_context(InputVStreams(self.network_group, input_params))
+        self.output_vstreams = self._streams.enter_context(OutputVStreams(self.network_group, output_params))
+        self._streams.enter_context(self.network_group.activate(self.network_group.create_params()))
+        self._input_vstream = next(iter(self.input_vstreams))  # Assuming single input
+        self._output_vstreams = list(self.output_vstreams)
+
+        # up to in_flight frames are on the accelerator at once: a sender thread pushes tensors while a receiver
+        # thread collects the outputs of earlier frames, so the device never waits on Python between frames
+        self.in_flight = in_flight
+        self.pending = 0
+
+        # preprocessing writes into preallocated buffers; a tensor stays untouched until its result is collected,
+        # so one more buffer than the in-flight window is enough as long as callers keep pending <= in_flight
+        input_height, input_width, input_channels = self.input_shape
+        input_dims = (input_height, input_width, 3) if input_channels == 3 else (input_height, input_width)
+        self._resize_buffer = np.empty((input_height, input_width, 3), dtype=np.uint8)
+        self._input_buffers = [np.empty(input_dims, dtype=np.uint8) for _ in range(in_flight + 1)]
+        self._input_index = 0
+        self._send_queue = Queue()
+        self._meta_queue = Queue()
+        self._result_queue = Queue()
+        self._sender = Thread(target=self._send_frames, daemon=True)
+        self._receiver = Thread(target=self._receive_results, daemon=True)
+        self._sender.start()
+        self._receiver.start()
+
     def read_label_file(self, label_file):
         labels = {}
         with open(label_file, 'r') as f:
@@ -66,74 +110,118 @@ class GreenOnGreen:
                     labels[int(pair[0])] = pair[1]
         return labels
 
-    def inference(self, image, confidence=0.5, filter_id=0):
+    def _send_frames(self):
+        while True:
+            input_image = self._send_queue.get()
+            if input_image is None:
+                break
+
+            self._input_vstream.send(input_image)
+
+    def _receive_results(self):
+        # outputs come back in submission order, so they pair up with the metadata queued by submit()
+        while True:
+            meta = self._meta_queue.get()
+            if meta is None:
+                break
+
+            output_data = [vstream.recv() for vstream in self._output_vstreams]
+            self._result_queue.put((meta, output_data))
+
+    def submit(self, image, confidence=0.5, filter_id=0, frame_id=None, draw=False, capture_time=None):
+        """ Preprocess a frame and queue it on the accelerator without waiting for the result. Boxes are only
+        drawn, on a copy of the frame, when draw is True. capture_time defaults to now and is returned with the
+        result, so actuation can be timed from the frame rather than from when its result arrived. """
+        if capture_time is None:
+            capture_time = time.time()
+
         # Preprocess the image
         height, width, _ = image.shape
         input_height, input_width, input_channels = self.input_shape
 
-        # Resize and convert image to the required shape
-        resized_image = cv2.resize(image, (input_width, input_height))
+        # Resize and convert image to the required shape. Camera frames are already uint8 in [0, 255], which the
+        # model expects, so no further conversion is needed
+        input_image = self._input_buffers[self._input_index]
+        self._input_index = (self._input_index + 1) % len(self._input_buffers)
+        resized_image = cv2.resize(image, (input_width, input_height), dst=self._resize_buffer)
         if input_channels == 3:
             # Assuming the model expects RGB images
-            input_image = cv2.cvtColor(resized_image, cv2.COLOR_BGR2RGB)
+            cv2.cvtColor(resized_image, cv2.COLOR_BGR2RGB, dst=input_image)
         else:
             # Assuming grayscale
-            input_image = cv2.cvtColor(resized_image, cv2.COLOR_BGR2GRAY)
-
-        # Normalize or preprocess the image if necessary
-        # Assuming the model expects uint8 images in [0, 255]
-        input_image = input_image.astype(np.uint8)
-
-        # Run inference
-        # Wrap the input in a list if necessary
-        input_data = [input_image]
-
-        # Write input data to the input VStreams
-        self.input_vstreams.write(input_data)
-
-        # Read output data from the output VStreams
-        output_data = self.output_vstreams.read()
-
-        # Map outputs
-        outputs = dict(zip(self.output_names, output_data))
-
-        # Assuming the output tensors are 'detection_boxes', 'detection_classes', 'detection_scores'
-        boxes = outputs.get('detection_boxes')
-        classes = outputs.get('detection_classes')
-        scores = outputs.get('detection_scores')
-
-        if boxes is None or classes is None or scores is None:
-            print("Output tensors not found.")
-            return None, [], [], image
-
-        # Now process the detections
-        self.weed_centers = []
-        self.boxes = []
-
-        num_detections = boxes.shape[0]
-
-        for i in range(num_detections):
-            if scores[i] >= confidence and classes[i] == filter_id:
-                # Scale the bounding box back to the original image size
-                ymin, xmin, ymax, xmax = boxes[i]
-                startX = int(xmin * width)
-                startY = int(ymin * height)
-                endX = int(xmax * width)
-                endY = int(ymax * height)
-                boxW = endX - startX
-                boxH = endY - startY
-
-                # Save the bounding box
-                self.boxes.append([startX, startY, boxW, boxH])
-                # Compute box center
-                centerX = int(startX + (boxW / 2))
-                centerY = int(startY + (boxH / 2))
-                self.weed_centers.append([centerX, centerY])
-
-                percent = int(100 * scores[i])
-                label = f'{percent}% {self.labels.get(classes[i], classes[i])}'
-                cv2.rectangle(image, (startX, startY), (endX, endY), (0, 0, 255), 2)
-                cv2.putText(image, label, (startX, startY + 30),
-                            cv2.FONT_HERSHEY_SIMPLEX, 1.0, (255, 0, 0), 2)
-        return None, self.boxes, self.weed_centers, image
-
+            cv2.cvtColor(resized_image, cv2.COLOR_BGR2GRAY, dst=input_image)
+
+        # the frame may be reused by the camera before its result arrives, so keep a copy if it will be drawn on
+        self._meta_queue.put((frame_id, image.copy() if draw else None, width, height, confidence, filter_id,
+                              capture_time))
+        self._send_queue.put(input_image)
+        self.pending += 1
+
+    def get_result(self, block=True, timeout=None):
+        """ Return the oldest finished frame as (contours, boxes, centres, image, frame_id, capture_time), or
+        None if block is False and nothing has finished yet. image is None unless the frame was submitted with
+        draw. """
+        try:
+            meta, output_data = self._result_queue.get(block=block, timeout=timeout)
+        except Empty:
+            return None
+
+        self.pending -= 1
+        frame_id, image, width, height, confidence, filter_id, capture_time = meta
+
+        boxes = output_data[self._box_idx].reshape(-1, 4)
+        classes = output_data[self._cls_idx].reshape(-1).astype(np.int32)
+        scores = output_data[self._score_idx].reshape(-1)
+
+        # filter and scale every detection at once rather than one row at a time
+        keep = (scores >= confidence) & (classes == filter_id)
+        kept_boxes = boxes[keep]
+        xmin = (kept_boxes[:, 1] * width).astype(np.int32)
+        ymin = (kept_boxes[:, 0] * height).astype(np.int32)
+        xmax = (kept_boxes[:, 3] * width).astype(np.int32)
+        ymax = (kept_boxes[:, 2] * height).astype(np.int32)
+        box_width = xmax - xmin
+        box_height = ymax - ymin
+
+        self.boxes = np.stack([xmin, ymin, box_width, box_height], axis=1).tolist()
+        self.weed_centers = np.stack([xmin + box_width // 2, ymin + box_height // 2], axis=1).tolist()
+
+        if image is not None:
+            self.draw_overlays(image, self.boxes, scores[keep], classes[keep])
+        return None, self.boxes, self.weed_centers, image, frame_id, capture_time
+
+    def draw_overlays(self, image, boxes, scores, classes):
+        for (startX, startY, boxW, boxH), score, class_id in zip(boxes, scores.tolist(), classes.tolist()):
+            label = f'{int(100 * score)}% {self.labels.get(class_id, class_id)}'
+            cv2.rectangle(image, (startX, startY), (startX + boxW, startY + boxH), (0, 0, 255), 2)
+            cv2.putText(image, label, (startX, startY + 30),
+                        cv2.FONT_HERSHEY_SIMPLEX, 1.0, (255, 0, 0), 2)
+
+    def inference(self, image, confidence=0.5, filter_id=0, draw=False):
+        """ Run one frame to completion. Only use when no frames are in flight from submit(). """
+        self.submit(image, confidence=confidence, filter_id=filter_id, draw=draw)
+        contours, boxes, centres, image_out, _, _ = self.get_result()
+        return contours, boxes, centres, image if image_out is None else image_out
+
+    def close(self):
+        # collect the frames still on the device first, so the receiver is not left blocked in recv()
+        drained = 0
+        while self.pending:
+            if self.get_result(timeout=1) is None:
+                break
+            drained += 1
+        if drained:
+            print(f'[INFO] Discarded {drained} in-flight GreenOnGreen results on close.')
+
+        self._send_queue.put(None)
+        self._meta_queue.put(None)
+        self._sender.join(timeout=1)
+        self._receiver.join(timeout=1)
+
+        # tearing down the vstreams under a live worker thread is unsafe, so leave them for process exit instead
+        if self._sender.is_alive() or self._receiver.is_alive():
+            print(f'[WARNING] GreenOnGreen worker threads did not exit ({self.pending} results outstanding); '
+                  f'leaving the device streams open.')
+            return
+
+        self._streams.close()
@@ -5,7 +5,7 @@ import numpy as np
 from datetime import datetime
 
 from multiprocessing import Process, Queue
-from multiprocessing.queues import Empty
+from multiprocessing.queues import Empty, Full
 
 class ImageRecorder:
     def __init__(self, save_directory, mode='whole', max_queue=200, new_process_threshold=90, max_processes=4):
@@ -81,9 +81,11 @@ class ImageRecorder:
             cv2.imwrite(filepath, square_image)
 
     def add_frame(self, frame, frame_id, boxes, centres):
-        if not self.queue.full():
-            self.queue.put((frame, frame_id, boxes, centres))
-        else:
+        # never block the detection loop on the writers; drop the frame if they have fallen behind
+        try:
+            # the queue pickles the frame later on a feeder thread, so callers must pass a frame they own
+            self.queue.put_nowait((frame, frame_id, boxes, centres))
+        except Full:
             print("[INFO] Queue is full, spinning up new process. Frame skipped.")
 
         if self.queue.qsize() > self.new_process_threshold and len(self.processes) < self.max_processes:
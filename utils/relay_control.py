@@ -252,8 +252,9 @@ class RelayController:
         self.status_led = status_led
         # instantiate relay control with supplied relay dictionary to map to correct board pins
         self.relay = RelayControl(self.relay_dict)
-        self.relay_queue_dict = {}
-        self.relay_condition_dict = {}
+        # relay ids run 0..n-1, so per-relay queues and conditions are indexed lists rather than dicts
+        self.relay_queues = []
+        self.relay_conditions = []
 
         # start the logger and log file using absolute path of python file
         self.save_dir = os.path.join(os.path.dirname(__file__), 'logs')
@@ -263,8 +264,8 @@ class RelayController:
         print("[INFO] Setting up nozzles...")
         self.relay_vis = RelayVis(relays=len(self.relay_dict.keys()))
         for relay_number in range(0, len(self.relay_dict)):
-            self.relay_queue_dict[relay_number] = collections.deque(maxlen=5)
-            self.relay_condition_dict[relay_number] = Condition()
+            self.relay_queues.append(collections.deque(maxlen=5))
+            self.relay_conditions.append(Condition())
 
             # create the consumer threads, setDaemon and start the threads.
             relay_thread = Thread(target=self.consumer, args=[relay_number])
@@ -287,8 +288,8 @@ class RelayController:
         :param duration: duration of spray
         """
         input_queue_message = [relay, time_stamp, delay, duration]
-        input_queue = self.relay_queue_dict[relay]
-        input_condition = self.relay_condition_dict[relay]
+        input_queue = self.relay_queues[relay]
+        input_condition = self.relay_conditions[relay]
         # notifies the consumer thread when something has been added to the queue
         with input_condition:
             input_queue.append(input_queue_message)
@@ -303,10 +304,10 @@ class RelayController:
         :param relay: relay id number
         """
         self.running = True
-        input_condition = self.relay_condition_dict[relay]
+        input_condition = self.relay_conditions[relay]
         input_condition.acquire()
         relay_on = False
-        relay_queue = self.relay_queue_dict[relay]
+        relay_queue = self.relay_queues[relay]
 
         while self.running:
             while relay_queue:
@@ -1,7 +1,9 @@
 import cv2
 import time
+import numpy as np
 import warnings
-from threading import Thread, Event, Condition, Lock
+import collections
+from threading import Thread, Event, Condition
 
 # determine availability of picamera versions
 try:
@@ -13,7 +15,7 @@ except Exception as e:
     PICAMERA_VERSION = None
 
 try:
-    from picamera2 import Picamera2
+    from picamera2 import Picamera2, MappedArray
     from libcamera import Transform
     import libcamera
     PICAMERA_VERSION = 'picamera2'
@@ -21,6 +23,58 @@ try:
 except Exception as e:
     PICAMERA_VERSION = None
 
+# frames are copied out of the camera into this many reusable arrays, and picamera2 is given as many buffers
+FRAME_POOL_SIZE = 5
+
+# two-slot ring between a capture thread (producer) and the main loop (consumer). The consumer always takes the
+# newest frame and only waits when nothing new has arrived since its last read.
+class LatestFrameBuffer:
+    def __init__(self, size=2):
+        self.ring = collections.deque(maxlen=size)
+        self.condition = Condition()
+        self.closed = False
+        self.in_use = None
+
+        # monotonically increasing ids; a frame is only handed out once, and skipped counts frames never read
+        self.frame_id = 0
+        self.read_id = 0
+        self.skipped = 0
+
+    def put(self, frame):
+        with self.condition:
+            self.ring.append(frame)
+            self.frame_id += 1
+            self.condition.notify()
+
+    def get(self):
+        with self.condition:
+            while self.frame_id == self.read_id and not self.closed:
+                self.condition.wait()
+
+            if self.frame_id == self.read_id:
+                return None
+
+            self.skipped += self.frame_id - self.read_id - 1
+            self.read_id = self.frame_id
+
+            frame = self.ring.pop()
+            self.ring.clear()
+            self.in_use = frame
+
+            return frame
+
+    def holds(self, frame):
+        # a frame is busy while queued or while it is the last one handed to the consumer
+        with self.condition:
+            return frame is self.in_use or any(queued is frame for queued in self.ring)
+
+    def close(self):
+        # wake any waiting consumer once the producer has finished
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+
 # class to support webcams
 class WebcamStream:
     def __init__(self, src=0):
@@ -36,10 +90,12 @@ class WebcamStream:
             raise ValueError("Unable to open video source:", src)
 
         # read the first frame from the stream
-        self.grabbed, self.frame = self.stream.read()
+        self.buffer = LatestFrameBuffer()
+        self.grabbed, frame = self.stream.read()
         if not self.grabbed:
             self.stream.release()  # Ensure resources are released if no frame is grabbed
             raise ValueError("Unable to read from video source:", src)
+        self.buffer.put(frame)
 
         # initialize the thread name, stop event, and the thread itself
         self.stop_event = Event()
@@ -56,20 +112,24 @@ class WebcamStream:
         try:
             while not self.stop_event.is_set():
                 # Read the next frame from the stream
-                self.grabbed, self.frame = self.stream.read()
+                self.grabbed, frame = self.stream.read()
 
                 # If not grabbed, end of the stream has been reached.
                 if not self.grabbed:
                     self.stop_event.set()  # Ensure the loop stops if no frame is grabbed
+                    break
+
+                self.buffer.put(frame)
         except Exception as e:
             print(f"Exception in WebcamStream update loop: {e}")
         finally:
             # Clean up resources after loop is done
+            self.buffer.close()
             self.stream.release()
 
     def read(self):
-        # return the frame most recently read
-        return self.frame
+        # return the newest frame, waiting only if it has already been read
+        return self.buffer.get()
 
     def stop(self):
         self.stop_event.set()
@@ -82,12 +142,9 @@ class PiCamera2Stream:
         self.size = resolution  # picamera2 uses size instead of resolution, keeping this consistent
         self.frame_width = None
         self.frame_height = None
-        self.frame = None
-        self.frame_available = False
+        self.buffer = LatestFrameBuffer()
 
         self.stopped = Event()
-        self.condition = Condition()
-        self.lock = Lock()
 
         # set the picamera2 config and controls. Refer to picamera2 documentation for full explanations:
 
@@ -129,6 +186,7 @@ class PiCamera2Stream:
             self.config = self.camera.create_preview_configuration(main=self.configurations,
                                                                    transform=Transform(hflip=True, vflip=True),
                                                                    queue=False,
+                                                                   buffer_count=FRAME_POOL_SIZE,
                                                                    controls=self.controls)
             self.camera.configure(self.config)
             self.camera.start()
@@ -157,31 +215,34 @@ class PiCamera2Stream:
         return self
 
     def update(self):
+        # capture_array allocates a new array per frame, so copy each request into a small reusable pool instead.
+        # The ring holds two frames and the consumer one more, so the pool always has a free slot.
+        pool = None
         try:
             while not self.stopped.is_set():
-                frame = self.camera.capture_array("main")
-                if frame is not None:
-                    with self.lock:
-                        self.frame = frame
-                        self.frame_available = True
+                request = self.camera.capture_request()
+                try:
+                    with MappedArray(request, "main") as mapped:
+                        source = mapped.array[:, :self.frame_width]
+                        if pool is None:
+                            pool = [np.empty_like(source) for _ in range(FRAME_POOL_SIZE)]
+
+                        frame = next(slot for slot in pool if not self.buffer.holds(slot))
+                        np.copyto(frame, source)
+                finally:
+                    request.release()
 
-                    with self.condition:
-                        self.condition.notify_all()
+                self.buffer.put(frame)
 
         except Exception as e:
             print(f"Exception in PiCamera2Stream update loop: {e}")
         finally:
+            self.buffer.close()
             self.camera.stop()  # Ensure camera resources are released properly
 
     def read(self):
-        # return the frame most recently read
-        with self.condition:
-            while not self.frame_available:
-                self.condition.wait()
-
-            while self.lock:
-                self.frame_available = False
-                return self.frame
+        # return the newest frame, waiting only if it has already been read
+        return self.buffer.get()
 
     def stop(self):
         self.stopped.set()
@@ -227,7 +288,7 @@ class PiCameraStream:
             print(f"Failed to initialize PiCamera: {e}")
             raise
 
-        self.frame = None
+        self.buffer = LatestFrameBuffer()
         self.stopped = Event()
         self.thread = Thread(target=self.update, name=self.name, args=())
         self.thread.daemon = True  # Thread will close when main program exits
@@ -240,7 +301,7 @@ class PiCameraStream:
     def update(self):
         try:
             for f in self.stream:
-                self.frame = f.array
+                self.buffer.put(f.array)
                 self.rawCapture.truncate(0)
 
                 if self.stopped.is_set():
@@ -249,13 +310,14 @@ class PiCameraStream:
             print(f"Exception in PiCameraStream update loop: {e}")
 
         finally:
+            self.buffer.close()
             self.stream.close()
             self.rawCapture.close()
             self.camera.close()
 
     def read(self):
-        # return the frame most recently read
-        return self.frame
+        # return the newest frame, waiting only if it has already been read
+        return self.buffer.get()
 
     def stop(self):
         # Signal the thread to stop
@@ -303,5 +365,7 @@ class VideoStream:
     def stop(self):
         # stop the thread and release any resources
         self.stream.stop()
+        # frames the capture thread overwrote before the main loop read them, i.e. capture outpaced processing
+        print(f"[INFO] Camera frames skipped: {self.stream.buffer.skipped}")
 
 